@@ -8,7 +8,7 @@ import json
 import hashlib
 import asyncio
 from typing import List, Optional, Dict
-from datetime import datetime
+from datetime import datetime, timezone
 
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form, BackgroundTasks
 from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
@@ -24,10 +24,12 @@ from src.parsers.document_parser import (
     build_document_data,
     save_document_files,
     get_chunk_prompt,
+    CHUNK_EXTRACTION_PROMPT,
     PageData,
     DocumentData
 )
 from src.db.connection import get_db_connection
+from src.utils.fast_json import load_file
 
 
 # ============================================================
@@ -45,6 +47,12 @@ PARALLEL_LIMIT = 5  # Concurrent API calls
 
 client = genai.Client(api_key=GOOGLE_API_KEY)
 
+# Shared by all chunk requests: the static instructions form a stable prefix
+# that Gemini can serve from its implicit prompt cache.
+CHUNK_GENERATE_CONFIG = types.GenerateContentConfig(
+    system_instruction=CHUNK_EXTRACTION_PROMPT
+)
+
 router = APIRouter(prefix="/api/kb", tags=["Knowledge Base"])
 
 
@@ -111,6 +119,9 @@ async def process_pdf_chunk(
     async with semaphore:
         temp_path = f"/tmp/chunk_{chunk_index}_{int(datetime.now().timestamp())}.pdf"
 
+        # Same prompt for every attempt
+        prompt = get_chunk_prompt(pages_in_chunk, start_page)
+
         try:
             with open(temp_path, "wb") as f:
                 f.write(chunk_bytes)
@@ -138,21 +149,22 @@ async def process_pdf_chunk(
                         raise Exception("File processing FAILED")
 
                     # Generate with metadata prompt
-                    prompt = get_chunk_prompt(pages_in_chunk, start_page)
-
                     response = await asyncio.wait_for(
                         client.aio.models.generate_content(
                             model=GOOGLE_MODEL_NAME,
                             contents=[types.Content(role="user", parts=[
                                 types.Part.from_uri(file_uri=file_upload.uri, mime_type=file_upload.mime_type),
                                 types.Part.from_text(text=prompt)
-                            ])]
+                            ])],
+                            config=CHUNK_GENERATE_CONFIG
                         ),
                         timeout=120
                     )
 
-                    # Parse response with metadata
-                    pages = parse_chunk_response(response.text, start_page, pages_in_chunk)
+                    # Parse response off the event loop: other chunks keep streaming
+                    pages = await asyncio.to_thread(
+                        parse_chunk_response, response.text, start_page, pages_in_chunk
+                    )
 
                     print(f"[CHUNK {chunk_index}] ✓ Extracted {len([p for p in pages if p.content])} content pages")
                     return pages
@@ -238,9 +250,9 @@ async def parse_pdf_with_metadata(
         pages=all_pages
     )
 
-    # Save files
+    # Save files (in a worker thread: other parse streams keep running)
     os.makedirs(DOCUMENTS_DIR, exist_ok=True)
-    txt_path, json_path = save_document_files(doc, DOCUMENTS_DIR)
+    txt_path, json_path = await asyncio.to_thread(save_document_files, doc, DOCUMENTS_DIR)
 
     print(f"[PARSER] ✓ Completed: {len(doc.summary['content_pages'])} content pages")
 
@@ -295,8 +307,7 @@ def load_document_json(file_hash: str) -> Optional[Dict]:
     """Загружает JSON документа"""
     json_path = os.path.join(DOCUMENTS_DIR, file_hash, 'content.json')
     if os.path.exists(json_path):
-        with open(json_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return load_file(json_path)
     return None
 
 
@@ -744,7 +755,7 @@ async def update_document_metadata(doc_id: str, metadata: DocumentMetadata):
         """, (
             metadata.doc_type,
             metadata.doc_subtype,
-            datetime.utcnow().isoformat() + 'Z',
+            datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
             doc_id
         ))
 
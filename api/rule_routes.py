@@ -13,6 +13,7 @@ from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 from src.utils.code_categories import get_code_category, group_codes_by_category, get_all_categories
+from src.utils.fast_json import load_file, dump_file
 from src.db.connection import get_db_connection
 
 router = APIRouter(prefix="/api/rules", tags=["rules"])
@@ -91,8 +92,7 @@ def get_rule_status(code: str) -> Dict:
     rule_path = os.path.join(RULES_DIR, f"{code.replace('.', '_')}.json")
 
     if os.path.exists(rule_path):
-        with open(rule_path, 'r') as f:
-            rule = json.load(f)
+        rule = load_file(rule_path)
         return {
             'has_rule': True,
             'is_mock': rule.get('is_mock', False),
@@ -144,8 +144,7 @@ def get_guideline_text_for_code(code: str, document_ids: Optional[List[str]] = N
         if not os.path.exists(content_path):
             continue
 
-        with open(content_path, 'r') as f:
-            doc_data = json.load(f)
+        doc_data = load_file(content_path)
 
         # Find pages where this code appears
         for page_data in doc_data.get('pages', []):
@@ -287,8 +286,7 @@ async def get_code_details(code: str):
         # Load content.json to find pages
         content_path = os.path.join(DOCUMENTS_DIR, file_hash, 'content.json')
         if os.path.exists(content_path):
-            with open(content_path, 'r') as f:
-                doc_data = json.load(f)
+            doc_data = load_file(content_path)
 
             for page_data in doc_data.get('pages', []):
                 for page_code in page_data.get('codes', []):
@@ -346,10 +344,7 @@ async def get_code_rule(code: str):
     if not os.path.exists(rule_path):
         raise HTTPException(status_code=404, detail=f"No rule found for code '{code}'")
 
-    with open(rule_path, 'r') as f:
-        rule = json.load(f)
-
-    return rule
+    return load_file(rule_path)
 
 
 @router.post("/generate/{code}")
@@ -366,8 +361,7 @@ async def generate_rule_stream(code: str, request: GenerateRuleRequest):
         raise HTTPException(status_code=400, detail=f"No guideline text found for code '{code}'")
 
     async def generate_stream():
-        import json
-        from datetime import datetime
+        from datetime import datetime, timezone
 
         # Step 1: Draft
         yield f"data: {json.dumps({'step': 'draft', 'status': 'starting', 'message': 'Generating draft...'})}\n\n"
@@ -402,15 +396,15 @@ async def generate_rule_stream(code: str, request: GenerateRuleRequest):
             'code_type': request.code_type,
             'version': '1.0',
             'is_mock': True,  # Mark as mock - no real content yet
-            'created_at': datetime.utcnow().isoformat() + 'Z',
+            'created_at': datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
             'draft': '# Mock draft - real content pending',
             'final': '# Mock rule - real content pending',
             'citations': []
         }
 
+        # Disk write off the event loop so other SSE streams keep flowing
         rule_path = os.path.join(RULES_DIR, f"{code.replace('.', '_')}.json")
-        with open(rule_path, 'w') as f:
-            json.dump(rule, f, indent=2)
+        await asyncio.to_thread(dump_file, rule, rule_path)
 
         yield f"data: {json.dumps({'step': 'final', 'status': 'complete', 'message': 'Rule saved'})}\n\n"
         yield f"data: {json.dumps({'step': 'done', 'status': 'complete', 'rule': rule})}\n\n"
@@ -445,14 +439,12 @@ async def clear_mock_rules():
     if not os.path.exists(RULES_DIR):
         return {'deleted': 0, 'kept': 0, 'codes': []}
 
-    for filename in os.listdir(RULES_DIR):
-        if not filename.endswith('.json'):
-            continue
+    with os.scandir(RULES_DIR) as entries:
+        rule_files = [(e.name, e.path) for e in entries if e.name.endswith('.json') and e.is_file()]
 
-        rule_path = os.path.join(RULES_DIR, filename)
+    for filename, rule_path in rule_files:
         try:
-            with open(rule_path, 'r') as f:
-                rule = json.load(f)
+            rule = load_file(rule_path)
 
             if rule.get('is_mock', False):
                 os.remove(rule_path)
@@ -479,15 +471,13 @@ async def get_rules_stats():
     real_count = 0
 
     if os.path.exists(RULES_DIR):
-        for filename in os.listdir(RULES_DIR):
-            if not filename.endswith('.json'):
-                continue
+        with os.scandir(RULES_DIR) as entries:
+            rule_paths = [e.path for e in entries if e.name.endswith('.json') and e.is_file()]
 
+        for rule_path in rule_paths:
             total += 1
-            rule_path = os.path.join(RULES_DIR, filename)
             try:
-                with open(rule_path, 'r') as f:
-                    rule = json.load(f)
+                rule = load_file(rule_path)
                 if rule.get('is_mock', False):
                     mock_count += 1
                 else:
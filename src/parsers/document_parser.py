@@ -19,18 +19,46 @@ import re
 import json
 import hashlib
 from typing import List, Dict, Optional, Tuple
-from dataclasses import dataclass, asdict
-from datetime import datetime
+from dataclasses import dataclass
+from functools import cached_property, lru_cache
+from itertools import chain
+from operator import attrgetter
+from datetime import datetime, timezone
 
 
-@dataclass
+# ============================================================
+# REGEX PATTERNS
+# ============================================================
+
+# CODE (TYPE) или CODE (TYPE: context)
+_CODE_RE = re.compile(r'([A-Za-z0-9.\-*]+)\s*\(([^:)]+)(?::\s*([^)]+))?\)')
+
+# parse_code_string: нормализация типа кода (ключи в upper case)
+_TYPE_NORM = {
+    'ICD-10': 'ICD-10', 'ICD10': 'ICD-10', 'ICD': 'ICD-10',
+    'HCPCS': 'HCPCS', 'HCPC': 'HCPCS',
+    'CPT': 'CPT', 'CPT-4': 'CPT',
+    'NDC': 'NDC',
+}
+
+# parse_chunk_response: блоки страниц между маркерами
+_PAGE_BLOCK_RE = re.compile(r'\[PAGE_START\](.*?)\[PAGE_END\]', re.DOTALL)
+
+# parse_page_block: все metadata-теги за один проход
+_TAG_RE = re.compile(r'\[(PAGE_TYPE|CODES|TOPICS|MEDICATIONS|SKIP):\s*([^\]]+)\]', re.IGNORECASE)
+
+# parse_page_block: strip tags from content (case-sensitive, как раньше)
+_STRIP_TAG_RE = re.compile(r'\[(?:PAGE_TYPE|CODES|TOPICS|MEDICATIONS|SKIP):[^\]]+\]')
+
+
+@dataclass(slots=True)
 class CodeInfo:
     code: str
     type: str  # ICD-10, HCPCS, CPT, NDC
     context: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class PageData:
     page: int
     page_type: str  # clinical, administrative, reference, toc, empty
@@ -56,11 +84,11 @@ class DocumentData:
     total_pages: int
     parsed_at: str
     pages: List[PageData]
-    summary: Dict = None
     
-    def __post_init__(self):
-        if self.summary is None:
-            self.summary = self._build_summary()
+    @cached_property
+    def summary(self) -> Dict:
+        """Summary по страницам — считается при первом обращении"""
+        return self._build_summary()
     
     def _build_summary(self) -> Dict:
         """Собирает summary из всех страниц"""
@@ -70,29 +98,40 @@ class DocumentData:
         content_pages = []
         skipped_pages = []
         
+        # Bound methods hoisted out of the per-page loop
+        codes_get = all_codes.get
+        content_append = content_pages.append
+        skipped_append = skipped_pages.append
+        topics_update = all_topics.update
+        medications_update = all_medications.update
+        
         for page in self.pages:
+            page_num = page.page
             if page.content:
-                content_pages.append(page.page)
+                content_append(page_num)
             else:
-                skipped_pages.append(page.page)
+                skipped_append(page_num)
             
-            # Aggregate codes with pages
+            # Aggregate codes with pages (pages as set, sorted list at the end)
             for code_info in page.codes:
-                key = code_info.code
-                if key not in all_codes:
-                    all_codes[key] = {
-                        'code': code_info.code,
+                code = code_info.code
+                entry = codes_get(code)
+                if entry is None:
+                    entry = all_codes[code] = {
+                        'code': code,
                         'type': code_info.type,
-                        'pages': [],
+                        'pages': set(),
                         'contexts': []
                     }
-                if page.page not in all_codes[key]['pages']:
-                    all_codes[key]['pages'].append(page.page)
+                entry['pages'].add(page_num)
                 if code_info.context:
-                    all_codes[key]['contexts'].append(code_info.context)
+                    entry['contexts'].append(code_info.context)
             
-            all_topics.update(page.topics)
-            all_medications.update(page.medications)
+            topics_update(page.topics)
+            medications_update(page.medications)
+        
+        for entry in all_codes.values():
+            entry['pages'] = sorted(entry['pages'])
         
         # Determine doc_type based on page_types
         page_types = [p.page_type for p in self.pages if p.content]
@@ -125,7 +164,10 @@ class DocumentData:
                     'page': p.page,
                     'page_type': p.page_type,
                     'content': p.content,
-                    'codes': [asdict(c) for c in p.codes],
+                    'codes': [
+                        {'code': c.code, 'type': c.type, 'context': c.context}
+                        for c in p.codes
+                    ],
                     'topics': p.topics,
                     'medications': p.medications,
                     'skip_reason': p.skip_reason
@@ -144,26 +186,17 @@ def parse_code_string(code_str: str) -> List[CodeInfo]:
     if not code_str or code_str.strip() == '-':
         return codes
     
-    # Pattern: CODE (TYPE) или CODE (TYPE: context)
-    pattern = r'([A-Z0-9\.\-\*]+)\s*\(([^:)]+)(?::\s*([^)]+))?\)'
-    matches = re.findall(pattern, code_str, re.IGNORECASE)
-    
-    for match in matches:
-        code = match[0].strip()
-        code_type = match[1].strip().upper()
-        context = match[2].strip() if len(match) > 2 and match[2] else None
-        
-        # Normalize code type
-        if code_type in ['ICD-10', 'ICD10', 'ICD']:
-            code_type = 'ICD-10'
-        elif code_type in ['HCPCS', 'HCPC']:
-            code_type = 'HCPCS'
-        elif code_type in ['CPT', 'CPT-4']:
-            code_type = 'CPT'
-        elif code_type in ['NDC']:
-            code_type = 'NDC'
-        
-        codes.append(CodeInfo(code=code, type=code_type, context=context))
+    # Без '(' pattern не может сработать — сразу к fallback
+    if '(' in code_str:
+        for match in _CODE_RE.finditer(code_str):
+            code = match.group(1).strip()
+            code_type = match.group(2).strip().upper()
+            context = match.group(3).strip() if match.group(3) else None
+            
+            # Normalize code type
+            code_type = _TYPE_NORM.get(code_type, code_type)
+            
+            codes.append(CodeInfo(code=code, type=code_type, context=context))
     
     # Fallback: если pattern не сработал, пробуем простой split
     if not codes and code_str:
@@ -179,24 +212,33 @@ def parse_code_string(code_str: str) -> List[CodeInfo]:
     return codes
 
 
+@lru_cache(maxsize=8192)
 def detect_code_type(code: str) -> str:
     """Определяет тип кода по формату"""
     code = code.strip().upper()
-    
-    # ICD-10: starts with letter, has dot (E11.9, F32.1, Z79.4)
-    if re.match(r'^[A-Z]\d', code) and ('.' in code or len(code) <= 3):
-        return 'ICD-10'
-    
-    # HCPCS: starts with letter, 4 digits (J1950, A4253, E0607)
-    if re.match(r'^[A-Z]\d{4}$', code):
-        return 'HCPCS'
-    
-    # CPT: 5 digits (99213, 96372)
-    if re.match(r'^\d{5}$', code):
-        return 'CPT'
-    
-    # NDC: 11 digits with dashes
-    if re.match(r'^\d{5}-\d{4}-\d{2}$', code) or re.match(r'^\d{11}$', code):
+    n = len(code)
+    
+    # Letter first: ICD-10 or HCPCS
+    if n and 'A' <= code[0] <= 'Z':
+        if n >= 2 and code[1].isdecimal():
+            # ICD-10: letter + digit, has dot or short (E11.9, F32.1, Z79.4, F32)
+            if '.' in code or n <= 3:
+                return 'ICD-10'
+            # HCPCS: letter + 4 digits (J1950, A4253, E0607)
+            if n == 5 and code[2:].isdecimal():
+                return 'HCPCS'
+        return 'Unknown'
+    
+    if code.isdecimal():
+        # CPT: 5 digits (99213, 96372)
+        if n == 5:
+            return 'CPT'
+        # NDC: 11 digits
+        if n == 11:
+            return 'NDC'
+    # NDC: 5-4-2 with dashes
+    elif (n == 13 and code[5] == '-' and code[10] == '-'
+          and code[:5].isdecimal() and code[6:10].isdecimal() and code[11:].isdecimal()):
         return 'NDC'
     
     return 'Unknown'
@@ -227,41 +269,31 @@ def parse_page_block(block: str, page_num: int) -> PageData:
     """
     page = PageData(page=page_num, page_type='clinical')
     
-    # Extract PAGE_TYPE
-    match = re.search(r'\[PAGE_TYPE:\s*([^\]]+)\]', block, re.IGNORECASE)
-    if match:
-        page.page_type = match.group(1).strip().lower()
-    
-    # Extract CODES
-    match = re.search(r'\[CODES:\s*([^\]]+)\]', block, re.IGNORECASE)
-    if match:
-        page.codes = parse_code_string(match.group(1))
-    
-    # Extract TOPICS
-    match = re.search(r'\[TOPICS:\s*([^\]]+)\]', block, re.IGNORECASE)
-    if match:
-        page.topics = parse_list_string(match.group(1))
-    
-    # Extract MEDICATIONS
-    match = re.search(r'\[MEDICATIONS:\s*([^\]]+)\]', block, re.IGNORECASE)
-    if match:
-        page.medications = parse_list_string(match.group(1))
-    
-    # Extract SKIP reason
-    match = re.search(r'\[SKIP:\s*([^\]]+)\]', block, re.IGNORECASE)
-    if match:
-        page.skip_reason = match.group(1).strip()
+    # Collect tags in one scan (first occurrence of each wins)
+    tags = {}
+    for match in _TAG_RE.finditer(block):
+        tags.setdefault(match.group(1).upper(), match.group(2))
+    
+    if 'PAGE_TYPE' in tags:
+        page.page_type = tags['PAGE_TYPE'].strip().lower()
+    
+    if 'CODES' in tags:
+        page.codes = parse_code_string(tags['CODES'])
+    
+    if 'TOPICS' in tags:
+        page.topics = parse_list_string(tags['TOPICS'])
+    
+    if 'MEDICATIONS' in tags:
+        page.medications = parse_list_string(tags['MEDICATIONS'])
+    
+    # SKIP reason
+    if 'SKIP' in tags:
+        page.skip_reason = tags['SKIP'].strip()
         page.content = None
         return page
     
     # Extract content (remove metadata tags)
-    content = block
-    content = re.sub(r'\[PAGE_TYPE:[^\]]+\]', '', content)
-    content = re.sub(r'\[CODES:[^\]]+\]', '', content)
-    content = re.sub(r'\[TOPICS:[^\]]+\]', '', content)
-    content = re.sub(r'\[MEDICATIONS:[^\]]+\]', '', content)
-    content = re.sub(r'\[SKIP:[^\]]+\]', '', content)
-    content = content.strip()
+    content = _STRIP_TAG_RE.sub('', block).strip()
     
     # Check if content is meaningful
     if content and len(content) > 30 and content.upper() != 'EMPTY':
@@ -281,31 +313,24 @@ def parse_chunk_response(response_text: str, start_page: int, expected_count: in
     Возвращает список PageData.
     """
     # Extract all blocks between markers
-    pattern = r'\[PAGE_START\](.*?)\[PAGE_END\]'
-    blocks = re.findall(pattern, response_text, re.DOTALL)
-    
-    results = []
-    
-    for i, block in enumerate(blocks):
-        page_num = start_page + i
-        page_data = parse_page_block(block, page_num)
-        results.append(page_data)
+    results = [
+        parse_page_block(match.group(1), page_num)
+        for page_num, match in enumerate(_PAGE_BLOCK_RE.finditer(response_text), start_page)
+    ]
     
     # Warning if count mismatch
-    if len(blocks) != expected_count:
-        print(f"⚠ WARNING: Expected {expected_count} pages, got {len(blocks)} blocks")
+    if len(results) != expected_count:
+        print(f"⚠ WARNING: Expected {expected_count} pages, got {len(results)} blocks")
     
     return results
 
 
 def merge_chunk_results(all_chunks: List[List[PageData]]) -> List[PageData]:
     """Объединяет результаты всех чанков и сортирует по номеру страницы"""
-    all_pages = []
-    for chunk in all_chunks:
-        all_pages.extend(chunk)
+    all_pages = list(chain.from_iterable(all_chunks))
     
     # Sort by page number
-    all_pages.sort(key=lambda p: p.page)
+    all_pages.sort(key=attrgetter('page'))
     
     return all_pages
 
@@ -321,7 +346,7 @@ def build_document_data(
         file_hash=file_hash,
         filename=filename,
         total_pages=total_pages,
-        parsed_at=datetime.utcnow().isoformat() + 'Z',
+        parsed_at=datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
         pages=pages
     )
 
@@ -335,24 +360,25 @@ def save_document_files(doc: DocumentData, output_dir: str) -> Tuple[str, str]:
     Returns: (txt_path, json_path)
     """
     import os
+    from src.utils.fast_json import dump_file
     
     doc_dir = os.path.join(output_dir, doc.file_hash)
     os.makedirs(doc_dir, exist_ok=True)
     
     # Save TXT
     txt_path = os.path.join(doc_dir, 'content.txt')
-    txt_content = []
-    for page in doc.pages:
-        if page.content:
-            txt_content.append(f"## Page {page.page}\n{page.content}")
-    
-    with open(txt_path, 'w', encoding='utf-8') as f:
-        f.write('\n\n'.join(txt_content))
+    with open(txt_path, 'w', encoding='utf-8', buffering=1 << 20) as f:
+        # Page by page, without building the whole text in memory
+        separator = ''
+        for page in doc.pages:
+            if page.content:
+                f.write(f"{separator}## Page {page.page}\n")
+                f.write(page.content)
+                separator = '\n\n'
     
     # Save JSON
     json_path = os.path.join(doc_dir, 'content.json')
-    with open(json_path, 'w', encoding='utf-8') as f:
-        json.dump(doc.to_dict(), f, indent=2, ensure_ascii=False)
+    dump_file(doc.to_dict(), json_path)
     
     return txt_path, json_path
 
@@ -361,7 +387,10 @@ def save_document_files(doc: DocumentData, output_dir: str) -> Tuple[str, str]:
 # PROMPT TEMPLATE
 # ============================================================
 
-CHUNK_EXTRACTION_PROMPT = """Extract text and metadata from these {pages_count} PDF pages.
+# Static instructions, identical for every chunk: sent as the system
+# instruction so the provider can reuse the cached prefix across chunks.
+# Everything chunk-specific lives in CHUNK_PAGES_PROMPT.
+CHUNK_EXTRACTION_PROMPT = """Extract text and metadata from the attached PDF pages.
 
 === OUTPUT FORMAT ===
 
@@ -431,7 +460,7 @@ If no medications: [MEDICATIONS: -]
 
 === CONTENT RULES ===
 
-1. Output EXACTLY {pages_count} page blocks
+1. Output EXACTLY one page block per PDF page (page count is given in the user message)
 2. Preserve text EXACTLY as written (typos, spacing)
 3. Convert tables to markdown format
 4. Remove printed page numbers (standalone "182", "45" at top/bottom)
@@ -465,8 +494,9 @@ GLP-1 receptor agonists are indicated for the treatment of type 2 diabetes melli
 [PAGE_TYPE: reference]
 [SKIP: References page - no clinical content]
 [PAGE_END]
+"""
 
-=== PAGES IN THIS CHUNK ===
+CHUNK_PAGES_PROMPT = """=== PAGES IN THIS CHUNK ===
 
 Total: {pages_count} pages
 Starting from PDF page: {start_page}
@@ -476,8 +506,8 @@ Output EXACTLY {pages_count} [PAGE_START]...[PAGE_END] blocks.
 
 
 def get_chunk_prompt(pages_count: int, start_page: int) -> str:
-    """Генерирует prompt для chunk extraction"""
-    return CHUNK_EXTRACTION_PROMPT.format(
+    """Генерирует chunk-специфичную часть prompt (инструкции — в CHUNK_EXTRACTION_PROMPT)"""
+    return CHUNK_PAGES_PROMPT.format(
         pages_count=pages_count,
         start_page=start_page
     )
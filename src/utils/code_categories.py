@@ -29,29 +29,36 @@ IGNORED_PATTERNS = [
     "Q5", "Q6",
 ]
 
+# O(1) membership for is_ignored_code (built once at import)
+_IGNORED_SET = frozenset(IGNORED_PATTERNS)
+
+
 def is_ignored_code(code: str, code_type: str = None) -> bool:
     """Check if code should be ignored (modifiers, etc.)"""
-    if not code:
+    return _is_ignored((code or '').upper().strip(), code_type)
+
+
+def _is_ignored(normalized: str, code_type: str = None) -> bool:
+    """is_ignored_code для уже нормализованного кода (upper + strip)"""
+    if not normalized:
         return True
 
     # Filter by type if provided
     if code_type and code_type.upper() == 'MODIFIER':
         return True
 
-    code_upper = code.upper().strip()
-
     # Handle ranges like "E1-E4" - check first part
-    if '-' in code_upper:
-        first_part = code_upper.split('-')[0].strip()
-        if first_part in IGNORED_PATTERNS or len(first_part) <= 2:
+    if '-' in normalized:
+        first_part = normalized.partition('-')[0].strip()
+        if first_part in _IGNORED_SET or len(first_part) <= 2:
             return True
 
     # Exact match for short modifiers
-    if code_upper in IGNORED_PATTERNS:
+    if normalized in _IGNORED_SET:
         return True
 
     # Also ignore if it's just 2 characters (likely a modifier)
-    if len(code_upper) <= 2:
+    if len(normalized) <= 2:
         return True
 
     return False
@@ -293,6 +300,22 @@ CPT_PREFIX_MAP: List[Tuple[str, str]] = [
 ]
 
 
+def _index_by_first_char(prefix_map: List[Tuple[str, str]]) -> Dict[str, List[Tuple[str, str]]]:
+    """
+    Группирует (prefix, category) по первому символу префикса.
+    Порядок внутри группы сохраняется, поэтому "first match wins" работает как раньше.
+    """
+    index: Dict[str, List[Tuple[str, str]]] = {}
+    for prefix, category in prefix_map:
+        index.setdefault(prefix[0], []).append((prefix, category))
+    return index
+
+
+# Lookup tables: only prefixes sharing the code's first character are checked
+_ICD10_PREFIX_INDEX = _index_by_first_char(ICD10_PREFIX_MAP)
+_CPT_PREFIX_INDEX = _index_by_first_char(CPT_PREFIX_MAP)
+
+
 # =============================================================================
 # CATEGORIZATION FUNCTIONS
 # =============================================================================
@@ -312,13 +335,15 @@ def get_code_category(code: str) -> Dict:
     if not code:
         return {'category': None, 'color': '#6B7280', 'matched_by': None}
 
-    code = code.upper().strip()
+    return _category_for_normalized(code.upper().strip())
+
 
+def _category_for_normalized(code: str) -> Dict:
+    """get_code_category для уже нормализованного кода (upper + strip)"""
     # Handle ranges like "E00-E89", "90832-90838"
     if '-' in code:
-        parts = code.split('-')
         # Try first part of range
-        code = parts[0].strip()
+        code = code.partition('-')[0].strip()
 
     # 1. Check exact matches first
     if code in ICD10_EXACT_MAP:
@@ -329,8 +354,10 @@ def get_code_category(code: str) -> Dict:
             'matched_by': f'exact {code}'
         }
 
+    first_char = code[:1]
+
     # 2. Check ICD-10 prefix matches
-    for prefix, category in ICD10_PREFIX_MAP:
+    for prefix, category in _ICD10_PREFIX_INDEX.get(first_char, ()):
         if code.startswith(prefix):
             return {
                 'category': category,
@@ -339,7 +366,7 @@ def get_code_category(code: str) -> Dict:
             }
 
     # 3. Check CPT/HCPCS matches
-    for prefix, category in CPT_PREFIX_MAP:
+    for prefix, category in _CPT_PREFIX_INDEX.get(first_char, ()):
         if code.startswith(prefix):
             return {
                 'category': category,
@@ -385,11 +412,12 @@ def group_codes_by_category(codes: List[Dict]) -> Dict[str, List[Dict]]:
         code = code_info.get('code', '')
         code_type = code_info.get('type', '')
 
-        # Skip modifiers and ignored codes
-        if is_ignored_code(code, code_type):
+        # Skip modifiers and ignored codes (normalize once for both checks)
+        normalized = (code or '').upper().strip()
+        if _is_ignored(normalized, code_type):
             continue
 
-        cat_info = get_code_category(code)
+        cat_info = _category_for_normalized(normalized)
         category = cat_info['category']
 
         # Skip codes without category (hide for demo)
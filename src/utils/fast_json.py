@@ -0,0 +1,42 @@
+"""
+JSON helpers.
+
+Используют orjson если он установлен, иначе stdlib json.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def loads(data):
+    """Parse JSON from str or bytes"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def load_file(path: str):
+    """Read and parse a JSON file (UTF-8)"""
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+def dumps(obj, indent: bool = False) -> bytes:
+    """Serialize to UTF-8 JSON bytes (indent=True — 2 spaces, как json indent=2)"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False).encode('utf-8')
+
+
+def dump_file(obj, path: str, indent: bool = True):
+    """Serialize first, then write in one call (no truncated file on error)"""
+    data = dumps(obj, indent=indent)
+    with open(path, 'wb') as f:
+        f.write(data)